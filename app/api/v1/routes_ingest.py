@@ -11,7 +11,8 @@ templates = Jinja2Templates(directory="app/static/upload_widget")
 def get_ingest_service(request: Request) -> IngestService:
     cfg = request.app.state.cfg
     vector_store = request.app.state.vector_store
-    return IngestService(vector_store=vector_store, upload_dir=cfg.UPLOAD_DIR)
+    cache = getattr(request.app.state, "cache", None)
+    return IngestService(vector_store=vector_store, upload_dir=cfg.UPLOAD_DIR, cache=cache)
 
 @router.get("/upload")
 async def get_upload_ui(request: Request):
@@ -24,6 +24,16 @@ class AppConfig:
     EMBED_MODEL: str = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-small")
     EMBED_CACHE_DIR: str = os.getenv("EMBED_CACHE_DIR", str(BASE_DIR/"data"/"cache"/"multilingual-e5-small"))
 
+    # Multi-worker - WORKERS > 1 thì model embedding chạy ở 1 process riêng (embed server)
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    EMBED_SERVER_HOST: str = os.getenv("EMBED_SERVER_HOST", "127.0.0.1")
+    EMBED_SERVER_PORT: int = int(os.getenv("EMBED_SERVER_PORT", "8765"))
+    EMBED_SERVER_AUTHKEY: str = os.getenv("EMBED_SERVER_AUTHKEY", "")
+
+    # Shared cache (SQLite) - dùng chung giữa các worker
+    SHARED_CACHE_PATH: str = os.getenv("SHARED_CACHE_PATH", str(BASE_DIR/"data"/"cache"/"shared_cache.sqlite3"))
+    ANSWER_CACHE_TTL: int = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
     # LLM (Ollama) - Config
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama3.2")
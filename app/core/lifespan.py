@@ -3,24 +3,48 @@ import qdrant_client
 from qdrant_client import AsyncQdrantClient
 from llama_index.core import VectorStoreIndex, Settings
 from llama_index.vector_stores.qdrant import QdrantVectorStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.llms.ollama import Ollama
 
 from app.core.config import get_config
 from app.services.rag.engine import get_query_engine
+from app.services.rag.embed_server import RemoteEmbedding
+from app.services.storage.cache import SharedCache
 
 @asynccontextmanager
 async def lifespan(app):
     cfg = get_config()
     print(">>> 🚀 Booting AI Server...")
 
-    # Embed model (HuggingFaceEmbedding CPU)
-    Settings.embed_model = HuggingFaceEmbedding(
-        model_name=cfg.EMBED_MODEL,
-        cache_folder=cfg.EMBED_CACHE_DIR,
-        embed_batch_size=10,
-        device="cpu"
-    )
+    # Shared cache (query embedding + answer) dùng chung giữa các worker
+    cache = SharedCache(cfg.SHARED_CACHE_PATH, answer_ttl=cfg.ANSWER_CACHE_TTL)
+    if cfg.WORKERS <= 1:
+        cache.clear_answers()  # Multi-worker: run() đã clear trước khi spawn worker
+
+    if cfg.WORKERS > 1:
+        # Multi-worker: model nằm ở embed server, worker chỉ giữ client (không import torch)
+        embed_model = RemoteEmbedding(
+            host=cfg.EMBED_SERVER_HOST,
+            port=cfg.EMBED_SERVER_PORT,
+            authkey=cfg.EMBED_SERVER_AUTHKEY,
+            model_name=cfg.EMBED_MODEL,
+            cache=cache,
+            embed_batch_size=10,
+        )
+        try:
+            embed_model.check()  # Fail sớm nếu chạy uvicorn/gunicorn --workers mà không có embed server
+        except Exception:
+            cache.close()
+            raise
+        Settings.embed_model = embed_model
+    else:
+        # Embed model (HuggingFaceEmbedding CPU)
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        Settings.embed_model = HuggingFaceEmbedding(
+            model_name=cfg.EMBED_MODEL,
+            cache_folder=cfg.EMBED_CACHE_DIR,
+            embed_batch_size=10,
+            device="cpu"
+        )
 
     # LLM (Ollama)
     Settings.llm = Ollama(
@@ -46,6 +70,8 @@ async def lifespan(app):
     app.state.qdrant_client = client
     app.state.qdrant_aclient = aclient
     app.state.vector_store = vector_store
+    app.state.cache = cache
+    app.state.cache_generation = cache.generation()
 
     # Cache / state cho RAG
     app.state.index = None
@@ -65,5 +91,9 @@ async def lifespan(app):
     try:
         await aclient.close()  # Đóng kết nối async
         client.close()
+    except:
+        pass
+    try:
+        cache.close()
     except:
         pass
\ No newline at end of file
@@ -22,6 +22,89 @@ def create_app() -> FastAPI:
 
 app = create_app()
 
-if __name__ == "__main__":
+def _start_embed_server(cfg, authkey: str):
+    """
+    Chạy embed server (1 bản model duy nhất) trước khi spawn worker.
+    Ready = kết nối + xác thực authkey thành công và process vẫn sống.
+    """
+    import multiprocessing, socket, time
+    from multiprocessing import AuthenticationError
+    from app.services.rag.embed_server import serve_embeddings, connect_embed_server
+
+    # Port đang bị process khác giữ -> báo lỗi ngay thay vì probe nhầm vào service khác
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind((cfg.EMBED_SERVER_HOST, cfg.EMBED_SERVER_PORT))
+        except OSError as e:
+            raise RuntimeError(f"Embed server port {cfg.EMBED_SERVER_HOST}:{cfg.EMBED_SERVER_PORT} unavailable: {e}")
+
+    proc = multiprocessing.get_context("spawn").Process(
+        target=serve_embeddings,
+        args=(cfg.EMBED_MODEL, cfg.EMBED_CACHE_DIR, cfg.EMBED_SERVER_HOST, cfg.EMBED_SERVER_PORT, authkey),
+        daemon=True,
+    )
+    proc.start()
+
+    deadline = time.monotonic() + 300
+    while time.monotonic() < deadline:
+        if not proc.is_alive():
+            raise RuntimeError(f"Embed server exited during startup (exitcode={proc.exitcode})")
+        try:
+            connect_embed_server(cfg.EMBED_SERVER_HOST, cfg.EMBED_SERVER_PORT, authkey.encode())
+        except AuthenticationError:
+            proc.terminate()
+            raise
+        except (OSError, EOFError):
+            time.sleep(0.5)
+            continue
+        if proc.is_alive():
+            return proc
+    proc.terminate()
+    raise RuntimeError("Embed server not ready after 300s")
+
+def _watch_embed_server(cfg, authkey: str, state: dict, stop):
+    """Embed server chết -> khởi động lại; RemoteEmbedding ở worker sẽ tự kết nối lại."""
+    while not stop.wait(2):
+        if state["proc"].is_alive():
+            continue
+        print(f">>> ⚠️ Embed server died (exitcode={state['proc'].exitcode}), restarting...")
+        try:
+            state["proc"] = _start_embed_server(cfg, authkey)
+        except Exception as e:
+            print(f">>> ❌ Embed server restart failed: {e}")
+
+def run():
+    import os, secrets, threading
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=False)
+    from app.core.config import get_config
+
+    cfg = get_config()
+    if cfg.WORKERS <= 1:
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=False)
+        return
+
+    # Clear answer cache 1 lần trước khi spawn worker (collection/model có thể đã đổi)
+    from app.services.storage.cache import SharedCache
+    cache = SharedCache(cfg.SHARED_CACHE_PATH)
+    cache.clear_answers()
+    cache.close()
+
+    # Authkey đưa vào env để các worker spawn sau đọc được qua get_config()
+    authkey = cfg.EMBED_SERVER_AUTHKEY or secrets.token_hex(16)
+    os.environ["EMBED_SERVER_AUTHKEY"] = authkey
+
+    state = {"proc": _start_embed_server(cfg, authkey)}
+    stop = threading.Event()
+    threading.Thread(target=_watch_embed_server, args=(cfg, authkey, state, stop), daemon=True).start()
+    try:
+        # Worker import llama_index khá lâu; healthcheck mặc định 5s sẽ kill worker khi nhiều worker khởi động cùng lúc
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=False, workers=cfg.WORKERS,
+                    timeout_worker_healthcheck=60)
+    finally:
+        stop.set()
+        state["proc"].terminate()
+        state["proc"].join(timeout=10)
+
+if __name__ == "__main__":
+    run()
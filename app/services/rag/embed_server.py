@@ -0,0 +1,170 @@
+# app/services/rag/embed_server.py
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from multiprocessing.managers import BaseManager
+from typing import List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+
+class _EmbedService:
+    """Object thật nằm trong embed server, giữ 1 bản model duy nhất cho mọi worker."""
+
+    def __init__(self, embed_model: BaseEmbedding):
+        self._model = embed_model
+        self._lock = threading.Lock()
+
+    def query(self, text: str) -> List[float]:
+        with self._lock:
+            return self._model.get_query_embedding(text)
+
+    def texts(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            return self._model.get_text_embedding_batch(texts)
+
+
+class EmbedManager(BaseManager):
+    pass
+
+
+EmbedManager.register("embedder")
+
+
+def connect_embed_server(host: str, port: int, authkey: bytes) -> EmbedManager:
+    """Kết nối + xác thực authkey với embed server (lỗi: ConnectionError / AuthenticationError)."""
+    manager = EmbedManager(address=(host, port), authkey=authkey)
+    manager.connect()
+    return manager
+
+
+def _exit_with_parent(parent: int):
+    while os.getppid() == parent:
+        time.sleep(2)
+    os._exit(0)
+
+
+def serve_embeddings(model_name: str, cache_folder: str, host: str, port: int, authkey: str):
+    """
+    Entry point của process embed server (chạy trước khi spawn worker).
+    Load model 1 lần rồi phục vụ qua IPC local (multiprocessing.managers).
+    """
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    # Parent (launcher) bị kill -9 thì daemon process không tự chết -> tự thoát khi mất parent
+    parent = os.getppid()
+    threading.Thread(target=_exit_with_parent, args=(parent,), daemon=True).start()
+
+    print(f">>> 🧠 Embed server loading {model_name}...")
+    service = _EmbedService(
+        HuggingFaceEmbedding(model_name=model_name, cache_folder=cache_folder, embed_batch_size=10, device="cpu")
+    )
+    EmbedManager.register("embedder", callable=lambda: service)
+    manager = EmbedManager(address=(host, port), authkey=authkey.encode())
+    server = manager.get_server()
+    print(f">>> ✅ Embed server listening on {host}:{port}")
+    server.serve_forever()
+
+
+class RemoteEmbedding(BaseEmbedding):
+    """
+    Embedding client cho worker: gọi embed server thay vì load model riêng.
+    Query embedding được cache trong SharedCache nên câu hỏi lặp lại không cần IPC.
+    """
+
+    host: str
+    port: int
+    _authkey: bytes = PrivateAttr()
+    _cache = PrivateAttr(default=None)
+    _local = PrivateAttr()
+
+    def __init__(self, host: str, port: int, authkey: str, model_name: str, cache=None, **kwargs):
+        super().__init__(host=host, port=port, model_name=model_name, **kwargs)
+        self._authkey = authkey.encode()
+        self._cache = cache
+        self._local = threading.local()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "RemoteEmbedding"
+
+    def _embedder(self):
+        """Proxy riêng cho từng thread (connection của manager không thread-safe)."""
+        proxy = getattr(self._local, "proxy", None)
+        if proxy is None:
+            proxy = connect_embed_server(self.host, self.port, self._authkey).embedder()
+            self._local.proxy = proxy
+        return proxy
+
+    def _call(self, method: str, *args):
+        """Gọi embed server; mất kết nối (server restart) thì bỏ proxy cũ, kết nối lại và thử 1 lần."""
+        try:
+            return getattr(self._embedder(), method)(*args)
+        except (EOFError, ConnectionError) as e:
+            logger.warning(f"Embed server {self.host}:{self.port} connection lost ({e!r}), reconnecting...")
+            self._drop_proxy()
+            try:
+                return getattr(self._embedder(), method)(*args)
+            except (EOFError, ConnectionError) as e:
+                self._drop_proxy()
+                logger.error(f"Embed server {self.host}:{self.port} unreachable: {e!r}")
+                raise
+
+    def _drop_proxy(self):
+        """
+        Bỏ proxy của thread hiện tại. BaseProxy cache connection theo (thread, address) dùng chung
+        cho mọi proxy cùng address -> phải xóa connection đó, nếu không proxy mới vẫn dùng socket chết.
+        """
+        proxy = getattr(self._local, "proxy", None)
+        self._local.proxy = None
+        if proxy is not None:
+            try:
+                del proxy._tls.connection
+            except AttributeError:
+                pass
+
+    def check(self):
+        """Gọi lúc startup: embed server phải chạy và authkey phải khớp."""
+        if not self._authkey:
+            raise RuntimeError("WORKERS > 1 nhưng EMBED_SERVER_AUTHKEY rỗng. Hãy chạy bằng `python -m app.main`.")
+        try:
+            connect_embed_server(self.host, self.port, self._authkey)
+        except Exception as e:
+            raise RuntimeError(
+                f"Không kết nối được embed server {self.host}:{self.port} ({e!r}). "
+                f"WORKERS > 1 cần embed server: hãy chạy bằng `python -m app.main`."
+            ) from e
+
+    def _cache_key(self, query: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\n{query}".encode("utf-8")).hexdigest()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        key = self._cache_key(query)
+        vector: Optional[List[float]] = self._cache.get_query_embedding(key) if self._cache is not None else None
+        if vector is not None:
+            return vector
+        vector = self._call("query", query)
+        if self._cache is not None:
+            self._cache.set_query_embedding(key, vector)
+        return vector
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._call("texts", [text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._call("texts", texts)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self._get_text_embedding, text)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self._get_text_embeddings, texts)
@@ -1,4 +1,6 @@
 # app/services/rag/engine.py
+import asyncio
+import hashlib
 import json
 import logging
 from typing import Any, Dict, List, Optional
@@ -95,20 +97,70 @@ def set_index(app, index: VectorStoreIndex):
     app.state.index = index
     invalidate_engines(app)
 
+
+async def _sync_generation(app) -> Optional[int]:
+    """
+    So generation trong shared cache với generation worker này đang giữ.
+    Worker khác ingest xong -> generation tăng -> worker này clear engines của mình.
+    """
+    cache = getattr(app.state, "cache", None)
+    if cache is None:
+        return None
+    generation = await asyncio.to_thread(cache.generation)
+    if generation is None:
+        return None
+    if generation != getattr(app.state, "cache_generation", None):
+        invalidate_engines(app)
+        app.state.cache_generation = generation
+    return generation
+
+
+def _answer_key(app, question: str, top_k: int) -> str:
+    """
+    Cache DB nằm trên đĩa, sống qua restart -> key gồm cả collection, model LLM và prompt
+    để đổi cấu hình không trả lại câu trả lời cũ.
+    """
+    cfg = app.state.cfg
+    raw = "\n".join([cfg.COLLECTION_NAME, cfg.OLLAMA_MODEL, QA_TEMPLATE.template, str(top_k), question.strip()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
 async def query_json(app, question: str, *, top_k: int = 3) -> Dict[str, Any]:
+    generation = await _sync_generation(app)
+    cache = getattr(app.state, "cache", None) if generation is not None else None
+    key = _answer_key(app, question, top_k)
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get_answer, key, generation)
+        if cached is not None:
+            return {**cached, "meta": {"top_k": top_k, "streaming": False, "cached": True}}
+
     qe = get_query_engine(app, streaming=False, top_k=top_k)
     resp = await qe.aquery(question)
 
-    return {
+    result = {
         "answer": str(resp),
         "sources": _extract_sources(resp),
         "meta": {"top_k": top_k, "streaming": False},
     }
+    if cache is not None:
+        await asyncio.to_thread(cache.set_answer, key, generation, {"answer": result["answer"], "sources": result["sources"]})
+    return result
 
 async def query_sse_generator(app, question: str, *, top_k: int = 3):
     """
     Generator SSE: start -> token* -> done|error
+    Cache hit: start -> token (cả câu trả lời) -> done
     """
+    generation = await _sync_generation(app)
+    cache = getattr(app.state, "cache", None) if generation is not None else None
+    key = _answer_key(app, question, top_k)
+    cached = await asyncio.to_thread(cache.get_answer, key, generation) if cache is not None else None
+    if cached is not None:
+        yield sse_event("start", {"ok": True})
+        yield sse_event("token", {"delta": cached["answer"]})
+        yield sse_event("done", {**cached, "meta": {"top_k": top_k, "streaming": True, "cached": True}})
+        return
+
     qe = get_query_engine(app, streaming=True, top_k=top_k)
 
     yield sse_event("start", {"ok": True})
@@ -119,11 +171,15 @@ async def query_sse_generator(app, question: str, *, top_k: int = 3):
             full.append(token)
             yield sse_event("token", {"delta": token})
 
+        answer = "".join(full)
+        sources = _extract_sources(resp)
+        if cache is not None:
+            await asyncio.to_thread(cache.set_answer, key, generation, {"answer": answer, "sources": sources})
         yield sse_event(
             "done",
             {
-                "answer": "".join(full),
-                "sources": _extract_sources(resp),
+                "answer": answer,
+                "sources": sources,
                 "meta": {"top_k": top_k, "streaming": True},
             },
         )
@@ -1,4 +1,4 @@
-import logging, sys, os, shutil, magic, csv, openpyxl, json
+import logging, sys, os, shutil, magic, csv, openpyxl, json, asyncio
 from typing import Generator, List, AsyncGenerator
 from pathlib import Path
 from fastapi import UploadFile, HTTPException
@@ -32,9 +32,10 @@ ALLOWED_EXTENSIONS = {
 }
 
 class IngestService:
-    def __init__(self, vector_store: QdrantVectorStore, upload_dir: str):
+    def __init__(self, vector_store: QdrantVectorStore, upload_dir: str, cache=None):
         self.vector_store = vector_store
         self.upload_dir = upload_dir
+        self.cache = cache  # SharedCache: bump generation sau ingest để mọi worker bỏ cache cũ
         self.text_splitter = SentenceSplitter(chunk_size=1024, chunk_overlap=200)
 
     @staticmethod
@@ -83,7 +84,9 @@ class IngestService:
     async def index_file(self, file_path: str)->AsyncGenerator[str, None]:
         """
         Hàm index_file Generator xử lý index file lưu vào qdrant theo từng batch chạy theo tiến trình.
+        Đã ghi (dù chỉ 1 phần) vào Qdrant thì luôn bump generation để các worker bỏ cache cũ.
         """
+        written = False
         try:
             pipeline = IngestionPipeline(
                 transformations=[
@@ -98,6 +101,7 @@ class IngestService:
             for doc_batch, file_progress in self._lazy_load_file(file_path,chunk_size_mb=5):
                 if not doc_batch:
                     continue
+                written = True  # arun có thể đã ghi 1 phần trước khi lỗi
                 nodes = await pipeline.arun(documents=doc_batch, show_progress=False)
                 ui_percent = 15 + int((file_progress / 100) * 80)
                 if ui_percent > 95: ui_percent = 95
@@ -110,6 +114,8 @@ class IngestService:
                 del doc_batch
                 del nodes
 
+            await self._invalidate_caches(written)
+            written = False
             yield json.dumps({"status": "complete", "progress": 100, "message": "✅ Hoàn tất! Tài liệu đã sẵn sàng."}) + "\n"
         except Exception as e:
             logger.exception(f"Lỗi khi lập chỉ mục: {e}")
@@ -117,6 +123,16 @@ class IngestService:
                 os.remove(file_path)
             yield json.dumps({"status": "error", "message": f"Lỗi xử lý AI: {str(e)}"}) + "\n"
             raise HTTPException(status_code=500, detail=f"Lỗi khi Indexing: {str(e)}")
+        finally:
+            await self._invalidate_caches(written)
+
+    async def _invalidate_caches(self, written: bool):
+        """Bump generation trong shared cache nếu đã ghi vào Qdrant."""
+        if written and self.cache is not None:
+            try:
+                await asyncio.to_thread(self.cache.bump_generation)
+            except Exception as e:
+                logger.exception(f"Không bump được generation của shared cache: {e}")
 
     @staticmethod
     def _lazy_load_file(file_path: str, chunk_size_mb: int = 10) -> Generator[tuple[List[Document], float], None, None]:
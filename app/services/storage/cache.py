@@ -0,0 +1,156 @@
+# app/services/storage/cache.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """
+    Cache dùng chung giữa các worker (SQLite WAL trên đĩa local).
+    - query_vectors: vector của câu hỏi (float32 BLOB, không phụ thuộc dữ liệu đã ingest)
+    - answers: câu trả lời đã sinh, gắn với `generation` hiện tại
+    - meta.generation: tăng mỗi lần ingest xong -> mọi worker thấy và bỏ cache cũ
+
+    Mọi hàm đều blocking -> phía async phải gọi qua asyncio.to_thread.
+    DB đang bị khóa (worker khác đang ghi) thì coi như cache miss, không chờ.
+    """
+
+    def __init__(self, path: str, answer_ttl: int = 3600, query_ttl: int = 7 * 24 * 3600,
+                 max_query_vectors: int = 50000, busy_timeout: float = 0.05):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.answer_ttl = answer_ttl
+        self.query_ttl = query_ttl
+        self.max_query_vectors = max_query_vectors
+        self._path = path
+        self._busy_ms = int(busy_timeout * 1000)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+            CREATE TABLE IF NOT EXISTS query_vectors (
+                key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                vector BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_query_vectors_created_at ON query_vectors (created_at);
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.execute(f"PRAGMA busy_timeout={self._busy_ms}")
+
+    def _read(self, sql: str, params: tuple = ()):
+        try:
+            with self._lock:
+                return self._conn.execute(sql, params).fetchone()
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Shared cache read skipped: {e}")
+            return None
+
+    def _write(self, sql: str, params: tuple = ()):
+        try:
+            with self._lock:
+                self._conn.execute(sql, params)
+                self._writes += 1
+                due = self._writes % 500 == 0
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Shared cache write skipped: {e}")
+            return
+        if due:
+            self.prune()
+
+    def generation(self) -> Optional[int]:
+        """None nếu không đọc được (DB bị khóa) -> bên gọi bỏ qua cache lần này."""
+        row = self._read("SELECT value FROM meta WHERE key = 'generation'")
+        return row[0] if row else None
+
+    def bump_generation(self) -> int:
+        """
+        Gọi sau ingest: tăng generation, xóa câu trả lời cũ và vector hết hạn.
+        Không được bỏ qua như cache miss -> chờ khóa tới 10s trên connection riêng,
+        không giữ self._lock nên chat trong cùng worker vẫn chạy.
+        """
+        conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+                gen = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+                conn.execute("DELETE FROM answers WHERE generation < ?", (gen,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        self.prune()
+        return gen
+
+    def clear_answers(self):
+        """Gọi 1 lần lúc khởi động process: bỏ mọi câu trả lời của lần chạy trước."""
+        conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("DELETE FROM answers")
+        finally:
+            conn.close()
+
+    def prune(self):
+        """Xóa answer/vector hết hạn và giữ tối đa `max_query_vectors` vector mới nhất."""
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.answer_ttl,))
+                self._conn.execute("DELETE FROM query_vectors WHERE created_at < ?", (now - self.query_ttl,))
+                self._conn.execute(
+                    "DELETE FROM query_vectors WHERE key IN ("
+                    "SELECT key FROM query_vectors ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_query_vectors,),
+                )
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Shared cache prune skipped: {e}")
+
+    def get_query_embedding(self, key: str) -> Optional[List[float]]:
+        row = self._read(
+            "SELECT vector FROM query_vectors WHERE key = ? AND created_at >= ?",
+            (key, time.time() - self.query_ttl),
+        )
+        return array("f", row[0]).tolist() if row else None
+
+    def set_query_embedding(self, key: str, vector: List[float]):
+        self._write(
+            "INSERT OR REPLACE INTO query_vectors (key, created_at, vector) VALUES (?, ?, ?)",
+            (key, time.time(), array("f", vector).tobytes()),
+        )
+
+    def get_answer(self, key: str, generation: int) -> Optional[Any]:
+        row = self._read(
+            "SELECT value FROM answers WHERE key = ? AND generation = ? AND created_at >= ?",
+            (key, generation, time.time() - self.answer_ttl),
+        )
+        return json.loads(row[0]) if row else None
+
+    def set_answer(self, key: str, generation: int, value: Any):
+        self._write(
+            "INSERT OR REPLACE INTO answers (key, generation, created_at, value) VALUES (?, ?, ?, ?)",
+            (key, generation, time.time(), json.dumps(value, ensure_ascii=False)),
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,139 @@
+"""
+Đo requests/sec và RAM tổng khi chạy server với 1, 2, 4, 8 worker.
+
+Cần Qdrant + Ollama đang chạy và knowledge base đã có dữ liệu.
+    python scripts/bench_workers.py --workers 1 2 4 8 --duration 30 --concurrency 16
+    python scripts/bench_workers.py --cached   # lặp lại 4 câu hỏi -> đo tốc độ trả từ answer cache
+
+Mặc định mỗi request là 1 câu hỏi khác nhau (không trúng answer cache) -> đo embedding + Qdrant + LLM.
+
+RSS: tổng VmRSS của cả cây process (đếm trùng trang nhớ chia sẻ).
+PSS: tổng Pss từ /proc/<pid>/smaps_rollup (chia đều trang chia sẻ) -> con số thực tế hơn. Chỉ chạy trên Linux.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BASE_DIR = Path(__file__).parent.parent
+URL = "http://127.0.0.1:8000"
+QUESTIONS = [
+    "Xin chào",
+    "Dự án Sala có những loại căn hộ nào?",
+    "Giá thuê căn hộ 2 phòng ngủ là bao nhiêu?",
+    "View căn hộ 3 phòng ngủ nhìn ra đâu?",
+]
+
+
+def _children(pid: int):
+    # Đọc children của mọi thread: embed server restart bởi watchdog là con của thread watchdog
+    kids = []
+    for path in Path(f"/proc/{pid}/task").glob("*/children"):
+        try:
+            kids += [int(p) for p in path.read_text().split()]
+        except OSError:
+            pass
+    return kids + [g for k in kids for g in _children(k)]
+
+
+def _read_kb(path: str, field: str) -> int:
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def memory_mb(root_pid: int):
+    pids = [root_pid] + _children(root_pid)
+    rss = sum(_read_kb(f"/proc/{p}/status", "VmRSS") for p in pids)
+    pss = sum(_read_kb(f"/proc/{p}/smaps_rollup", "Pss") for p in pids)
+    return len(pids), rss / 1024, pss / 1024
+
+
+async def _wait_ready(timeout: float = 600):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(URL + "/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(1)
+    raise RuntimeError("Server not ready")
+
+
+async def _load(duration: float, concurrency: int, cached: bool):
+    counter = itertools.count()
+    run_id = int(time.time())  # shared cache còn giữ câu hỏi của lần chạy trước
+    ok = errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal ok, errors
+        while time.monotonic() < deadline:
+            i = next(counter)
+            question = QUESTIONS[i % len(QUESTIONS)]
+            if not cached:
+                question = f"{question} (#{run_id}-{i})"
+            try:
+                resp = await client.post(URL + "/api/chat", json={"question": question})
+                if resp.status_code == 200:
+                    ok += 1
+                else:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+
+    started = time.monotonic()
+    async with httpx.AsyncClient(timeout=None) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return ok, errors, time.monotonic() - started
+
+
+def bench(workers: int, duration: float, concurrency: int, cached: bool):
+    env = {**os.environ, "WORKERS": str(workers)}
+    log_path = BASE_DIR / "data" / "logs" / f"bench_server_{workers}.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log = open(log_path, "w")
+    proc = subprocess.Popen([sys.executable, "-m", "app.main"], cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        asyncio.run(_wait_ready())
+        time.sleep(5)  # chờ mọi worker chạy xong lifespan
+        ok, errors, elapsed = asyncio.run(_load(duration, concurrency, cached))
+        n_procs, rss, pss = memory_mb(proc.pid)
+        return ok / elapsed, errors, n_procs, rss, pss
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cached", action="store_true", help="Lặp lại câu hỏi (đo answer cache)")
+    args = parser.parse_args()
+
+    rows = [(w, *bench(w, args.duration, args.concurrency, args.cached)) for w in args.workers]
+
+    print(f"\nmode: {'cached (answer cache)' if args.cached else 'uncached (unique questions)'}")
+    print(f"{'workers':>7} {'req/s':>8} {'errors':>6} {'procs':>5} {'RSS MB':>8} {'PSS MB':>8}")
+    for w, rps, errors, n_procs, rss, pss in rows:
+        print(f"{w:>7} {rps:>8.2f} {errors:>6} {n_procs:>5} {rss:>8.0f} {pss:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.rag.engine import _answer_key, _sync_generation
+from app.services.storage.cache import SharedCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "shared_cache.sqlite3")
+
+
+class _LockedConnection:
+    def execute(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_answers_visible_across_connections(cache_path):
+    a, b = SharedCache(cache_path), SharedCache(cache_path)
+    a.set_answer("k", a.generation(), {"answer": "x", "sources": []})
+    assert b.get_answer("k", b.generation()) == {"answer": "x", "sources": []}
+
+
+def test_bump_generation_deletes_older_answers(cache_path):
+    a, b = SharedCache(cache_path), SharedCache(cache_path)
+    a.set_answer("k", 0, {"answer": "x"})
+    assert b.bump_generation() == 1
+    assert a.generation() == 1
+    assert a.get_answer("k", 0) is None  # đã bị xóa, không chỉ bị lọc theo generation
+
+
+def test_bump_waits_without_blocking_reads(cache_path):
+    cache = SharedCache(cache_path)
+    writer = sqlite3.connect(cache_path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    bump = threading.Thread(target=cache.bump_generation)
+    bump.start()
+    try:
+        time.sleep(0.2)  # bump đang chờ khóa ghi
+        started = time.monotonic()
+        assert cache.generation() == 0
+        assert time.monotonic() - started < 0.5
+    finally:
+        writer.execute("ROLLBACK")
+    bump.join(timeout=5)
+    assert cache.generation() == 1
+
+
+def test_clear_answers(cache_path):
+    cache = SharedCache(cache_path)
+    cache.set_answer("k", 0, {"answer": "x"})
+    cache.set_query_embedding("q", [1.0])
+    cache.clear_answers()
+    assert cache.get_answer("k", 0) is None
+    assert cache.get_query_embedding("q") == [1.0]
+
+
+def _app(collection="company_docs", model="llama3.2"):
+    return SimpleNamespace(state=SimpleNamespace(cfg=SimpleNamespace(COLLECTION_NAME=collection, OLLAMA_MODEL=model)))
+
+
+def test_answer_key_scoped_to_collection_and_model(cache_path):
+    cache = SharedCache(cache_path)
+    cache.set_answer(_answer_key(_app(), "Xin chào", 3), 0, {"answer": "x"})
+
+    assert cache.get_answer(_answer_key(_app(), "Xin chào", 3), 0) == {"answer": "x"}
+    assert cache.get_answer(_answer_key(_app(collection="other_docs"), "Xin chào", 3), 0) is None
+    assert cache.get_answer(_answer_key(_app(model="qwen2.5"), "Xin chào", 3), 0) is None
+    assert cache.get_answer(_answer_key(_app(), "Xin chào", 5), 0) is None
+
+
+def test_stale_generation_is_a_miss(cache_path):
+    cache = SharedCache(cache_path)
+    cache.set_answer("k", 0, {"answer": "x"})
+    assert cache.get_answer("k", 1) is None
+
+
+def test_answer_ttl_expiry(cache_path):
+    cache = SharedCache(cache_path, answer_ttl=60)
+    cache.set_answer("k", 0, {"answer": "x"})
+    cache._conn.execute("UPDATE answers SET created_at = ?", (time.time() - 120,))
+    assert cache.get_answer("k", 0) is None
+
+
+def test_query_embedding_roundtrip_float32(cache_path):
+    cache = SharedCache(cache_path)
+    cache.set_query_embedding("q", [0.5, -0.25, 1.0])
+    assert SharedCache(cache_path).get_query_embedding("q") == [0.5, -0.25, 1.0]
+
+
+def test_prune_caps_and_expires_query_vectors(cache_path):
+    cache = SharedCache(cache_path, query_ttl=60, max_query_vectors=2)
+    now = time.time()
+    for i in range(4):
+        cache.set_query_embedding(f"q{i}", [float(i)])
+        cache._conn.execute("UPDATE query_vectors SET created_at = ? WHERE key = ?", (now - 10 + i, f"q{i}"))
+    cache.prune()
+    assert [cache.get_query_embedding(f"q{i}") for i in range(4)] == [None, None, [2.0], [3.0]]
+
+    cache._conn.execute("UPDATE query_vectors SET created_at = ?", (time.time() - 120,))
+    cache.prune()
+    assert cache._conn.execute("SELECT COUNT(*) FROM query_vectors").fetchone()[0] == 0
+
+
+def test_locked_database_is_a_fast_miss(cache_path):
+    cache = SharedCache(cache_path, busy_timeout=0.05)
+    cache.set_answer("k", 0, {"answer": "x"})
+    writer = sqlite3.connect(cache_path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        cache.set_answer("k2", 0, {"answer": "y"})  # không raise, bỏ qua
+        assert time.monotonic() - started < 1
+        assert cache.get_answer("k", 0) == {"answer": "x"}  # WAL: đọc vẫn được khi đang có writer
+    finally:
+        writer.execute("ROLLBACK")
+    assert cache.get_answer("k2", 0) is None
+
+
+def test_generation_unreadable_is_none(cache_path):
+    cache = SharedCache(cache_path)
+    cache._conn = _LockedConnection()
+    assert cache.generation() is None
+    assert cache.get_answer("k", 0) is None
+
+
+@pytest.mark.asyncio
+async def test_sync_generation_invalidates_engines(cache_path):
+    cache = SharedCache(cache_path)
+    app = SimpleNamespace(state=SimpleNamespace(
+        cache=cache,
+        cache_generation=cache.generation(),
+        query_engine_json=object(),
+        query_engine_stream=object(),
+    ))
+
+    assert await _sync_generation(app) == 0
+    assert app.state.query_engine_json is not None
+
+    SharedCache(cache_path).bump_generation()  # worker khác ingest xong
+    assert await _sync_generation(app) == 1
+    assert app.state.query_engine_json is None
+    assert app.state.query_engine_stream is None
+    assert app.state.cache_generation == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_generation_keeps_engines_when_unreadable(cache_path):
+    cache = SharedCache(cache_path)
+    engine = object()
+    app = SimpleNamespace(state=SimpleNamespace(
+        cache=cache, cache_generation=0, query_engine_json=engine, query_engine_stream=engine,
+    ))
+    cache._conn = _LockedConnection()
+    assert await _sync_generation(app) is None
+    assert app.state.query_engine_json is engine